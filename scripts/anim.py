@@ -1,17 +1,23 @@
 #!/usr/bin/env python
 
+import io
 import time
 import sys
 import numpy as np
 import torch
+import zstandard as zstd
 
 from src.utils import np2ascii
 
 
 if __name__ == '__main__':
-    data = np.load('train-fs12-mh12.npz')
-    slices = data['lens']
-    data = data['data']
+    with open('train-fs12-mh12.zst', 'rb') as f:
+        buf = io.BytesIO(zstd.ZstdDecompressor().stream_reader(f).read())
+    packed = np.load(buf)
+    n_bits = int(np.load(buf))
+    slices = np.load(buf)
+    # Pixels are stored bit-packed; unpack and trim the padding bits.
+    data = np.unpackbits(packed)[:n_bits]
 
     x = data[slices[0][0]: slices[0][1]]
     x = torch.from_numpy(x)
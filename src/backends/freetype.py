@@ -29,48 +29,71 @@
 #  - Refactoring
 
 
+import os
+import hashlib
+import warnings
 from functools import lru_cache
 
 import numpy as np
 import freetype
+import diskcache
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _unpack_mono_buffer(buf, rows, pitch, width):
+    """Unpack a packed mono buffer bit by bit into a `(rows, width)` uint8 array."""
+    out = np.zeros((rows, width), dtype=np.uint8)
+    for y in range(rows):
+        for x in range(width):
+            out[y, x] = (buf[y * pitch + x // 8] >> (7 - x % 8)) & 1
+    return out
+
+
+if njit is not None:
+    _unpack_mono_buffer = njit(cache=True)(_unpack_mono_buffer)
+    # Compile at import time so the first glyph doesn't pay the JIT cost.
+    _unpack_mono_buffer(np.zeros(1, dtype=np.uint8), 1, 1, 8)
 
 
 class Bitmap:
     """
-    A 2D bitmap image represented as a list of byte values. Each byte indicates the state
-    of a single pixel in the bitmap. A value of 0 indicates that the pixel is `off`
-    and any other value indicates that it is `on`.
+    A 2D bitmap image represented as a `(height, width)` array of byte values.
+    Each byte indicates the state of a single pixel in the bitmap. A value of 0
+    indicates that the pixel is `off` and any other value indicates that it is `on`.
     """
     def __init__(self, width, height, pixels=None):
         self.width = width
         self.height = height
         self.pixels = pixels if pixels is not None else \
-            np.zeros(self.width * self.height, dtype='bool')
+            np.zeros((self.height, self.width), dtype='uint8')
 
     def __repr__(self):
         """Return a string representation of the bitmap's pixels."""
         rows = ''
-        for y in range(self.height):
-            for x in range(self.width):
-                rows += '#' if self.pixels[y * self.width + x] else '.'
+        for row in self.pixels:
+            rows += ''.join('#' if pixel else '.' for pixel in row)
             rows += '\n'
         return rows
 
     def bitblt(self, src, x, y):
         """Copy all pixels from `src` into this bitmap"""
-        srcpixel = 0
-        dstpixel = y * self.width + x
-        srcw = src.width
-        row_offset = self.width - srcw
+        # Clip the source against the bitmap bounds: when a fixed `height` is
+        # requested from `render_text`, tall glyphs may extend past the top.
+        y0, x0 = max(y, 0), max(x, 0)
+        y1 = min(y + src.height, self.height)
+        x1 = min(x + src.width, self.width)
+        if y0 >= y1 or x0 >= x1:
+            return
 
-        for sy in range(src.height):
-            # Perform an OR operation on the destination pixel and the source pixel
-            # because glyph bitmaps may overlap if character kerning is applied, e.g.
-            # in the string "AVA", the "A" and "V" glyphs must be rendered with
-            # overlapping bounding boxes.
-            self.pixels[dstpixel: dstpixel + srcw] |= src.pixels[srcpixel: srcpixel + srcw]
-            srcpixel += srcw
-            dstpixel += row_offset + srcw
+        # Perform an OR operation on the destination pixels and the source pixels
+        # because glyph bitmaps may overlap if character kerning is applied, e.g.
+        # in the string "AVA", the "A" and "V" glyphs must be rendered with
+        # overlapping bounding boxes.
+        self.pixels[y0: y1, x0: x1] |= src.pixels[y0 - y: y1 - y, x0 - x: x1 - x]
 
 
 class Glyph:
@@ -92,6 +115,17 @@ class Glyph:
         # that is, how many pixels we move to the right to draw the next glyph.
         self.advance_width = advance_width
 
+    @lru_cache(maxsize=None)
+    def prerendered_for(self, height, baseline):
+        """
+        Return a `(height, width)` Bitmap with this glyph already placed at its
+        vertical position for the given output height and baseline, so blitting
+        it reduces to a horizontal OR with no per-character y arithmetic.
+        """
+        strip = Bitmap(self.width, height)
+        strip.bitblt(self.bitmap, 0, height - self.ascent - baseline)
+        return strip
+
     @staticmethod
     def from_glyphslot(slot):
         """Construct and return a Glyph object from a FreeType GlyphSlot."""
@@ -108,42 +142,28 @@ class Glyph:
     @staticmethod
     def unpack_mono_bitmap(bitmap):
         """
-        Unpack a freetype FT_LOAD_TARGET_MONO glyph bitmap into a bytearray where each
-        pixel is represented by a single byte.
+        Unpack a freetype FT_LOAD_TARGET_MONO glyph bitmap into a `(rows, width)`
+        uint8 array where each element indicates the state of a single pixel.
         """
-        # Allocate a bytearray of sufficient size to hold the glyph bitmap.
-        data = bytearray(bitmap.rows * bitmap.width)
-
-        # Iterate over every byte in the glyph bitmap. Note that we're not
-        # iterating over every pixel in the resulting unpacked bitmap --
-        # we're iterating over the packed bytes in the input bitmap.
-        for y in range(bitmap.rows):
-            for byte_index in range(bitmap.pitch):
-                # Read the byte that contains the packed pixel data.
-                byte_value = bitmap.buffer[y * bitmap.pitch + byte_index]
-
-                # We've processed this many bits (=pixels) so far. This determines
-                # where we'll read the next batch of pixels from.
-                num_bits_done = byte_index * 8
-
-                # Pre-compute where to write the pixels that we're going
-                # to unpack from the current byte in the glyph bitmap.
-                rowstart = y * bitmap.width + byte_index * 8
-
-                # Iterate over every bit (=pixel) that's still a part of the
-                # output bitmap. Sometimes we're only unpacking a fraction of a byte
-                # because glyphs may not always fit on a byte boundary. So we make sure
-                # to stop if we unpack past the current row of pixels.
-                for bit_index in range(min(8, bitmap.width - num_bits_done)):
-
-                    # Unpack the next pixel from the current glyph byte.
-                    bit = byte_value & (1 << (7 - bit_index))
-
-                    # Write the pixel to the output bytearray. We ensure that `off`
-                    # pixels have a value of 0 and `on` pixels have a value of 1.
-                    data[rowstart + bit_index] = 1 if bit else 0
-
-        return np.array(data, dtype='bool')
+        # The `bitmap.buffer` property builds a Python list byte by byte, so
+        # bypass it and alias FreeType's internal buffer directly instead.
+        # Aliasing is safe here: both unpack paths below allocate fresh
+        # output, and FreeType only reuses the buffer on the next load_char.
+        size = bitmap.rows * abs(bitmap.pitch)
+        if size == 0:
+            return np.zeros((bitmap.rows, bitmap.width), dtype=np.uint8)
+        buf = np.ctypeslib.as_array(bitmap._FT_Bitmap.buffer, shape=(size,))
+
+        # Each row is `pitch` bytes wide with 8 pixels packed per byte. Let
+        # numpy unpack all bits at once and crop the padding bits that may
+        # exist beyond `width` since rows don't always end on byte boundaries.
+        if bitmap.pitch > 0 and buf.size == bitmap.rows * bitmap.pitch:
+            buf = buf.reshape(bitmap.rows, bitmap.pitch)
+            return np.unpackbits(buf, axis=1)[:, :bitmap.width]
+
+        # Fall back to the scalar kernel (numba-compiled when available) for
+        # buffers whose pitch doesn't allow the row-wise reshape above.
+        return _unpack_mono_buffer(buf, bitmap.rows, bitmap.pitch, bitmap.width)
 
 
 class Font:
@@ -151,14 +171,42 @@ class Font:
         self.face = freetype.Face(filename)
         self.face.set_pixel_sizes(0, size)
 
-    @lru_cache
-    def glyph_for_character(self, char):
+        # The font-wide descent below the baseline in pixels (26.6 fixed
+        # point), usable as a fixed baseline across independent renders.
+        self.descent = -self.face.size.descender // 64
+
+        ascii_chars = list(map(chr, range(32, 127)))
+
+        # Glyph cache: preload printable ASCII, which covers nearly all of a
+        # typical corpus; other characters are loaded and cached on demand.
+        # A plain dict avoids lru_cache's bookkeeping on the hottest lookup.
+        self._glyphs = {char: self._load_glyph(char) for char in ascii_chars}
+
+        # Kerning table: precompute all ASCII pairs so the per-character
+        # lookup in the rendering loop is a dict hit instead of an FFI call.
+        self._kern = {
+            (a, b): self._load_kerning(a, b)
+            for a in ascii_chars for b in ascii_chars}
+
+    def _load_glyph(self, char):
         # Let FreeType load the glyph for the given character and tell it to render
         # a monochromatic bitmap representation.
         self.face.load_char(char, freetype.FT_LOAD_RENDER | freetype.FT_LOAD_TARGET_MONO)
         return Glyph.from_glyphslot(self.face.glyph)
 
-    @lru_cache
+    def glyph_for_character(self, char):
+        glyph = self._glyphs.get(char)
+        if glyph is None:
+            glyph = self._glyphs[char] = self._load_glyph(char)
+        return glyph
+
+    def _load_kerning(self, previous_char, char):
+        kerning = self.face.get_kerning(previous_char, char)
+
+        # The kerning offset is given in FreeType's 26.6 fixed point format,
+        # which means that the pixel values are multiples of 64.
+        return kerning.x // 64
+
     def kerning_offset(self, previous_char, char):
         """
         Return the horizontal kerning offset in pixels when rendering `char`
@@ -170,21 +218,14 @@ class Font:
         case the glyph for "V" has a negative horizontal kerning offset as it is
         moved slightly towards the "A".
         """
-        kerning = self.face.get_kerning(previous_char, char)
-
-        # The kerning offset is given in FreeType's 26.6 fixed point format,
-        # which means that the pixel values are multiples of 64.
-        return kerning.x // 64
-
-    @staticmethod
-    @lru_cache
-    def _max(a, b):
-        return max(a, b)
+        if previous_char is None:
+            return 0
 
-    @staticmethod
-    @lru_cache
-    def _min(a, b):
-        return min(a, b)
+        offset = self._kern.get((previous_char, char))
+        if offset is None:
+            offset = self._kern[(previous_char, char)] = \
+                self._load_kerning(previous_char, char)
+        return offset
 
     def text_dimensions(self, text, glyphs):
         """Return (width, height, baseline) of `text` rendered in the current font."""
@@ -200,61 +241,164 @@ class Font:
         for char, glyph in zip(text, glyphs):
             kerning_x = self.kerning_offset(previous_char, char)
 
-            max_ascent = self._max(max_ascent, glyph.ascent)
-            max_descent = self._max(max_descent, glyph.descent)
+            max_ascent = max(max_ascent, glyph.ascent)
+            max_descent = max(max_descent, glyph.descent)
 
             # With kerning, the advance width may be less than the width of the glyph's bitmap.
             # Make sure we compute the total width so that all of the glyph's pixels
             # fit into the returned dimensions.
-            width += self._max(glyph.advance_width + kerning_x, glyph.width + kerning_x)
+            width += max(glyph.advance_width, glyph.width) + kerning_x
 
             previous_char = char
 
         height = max_ascent + max_descent
         return (width, height, max_descent)
 
-    def render_text(self, text, height=None):
+    def render_text(self, text, height=None, baseline=None):
         """
         Render the given `text` into a Bitmap and return it.
-        """
-
-        # Get glyphs
-        glyphs = [self.glyph_for_character(char) for char in text]
 
-        # Determine dimensions
-        width, _height, baseline = self.text_dimensions(text, glyphs)
+        `baseline` fixes the number of pixels reserved below the baseline;
+        when `None`, the maximum descent of the rendered glyphs is used.
+        """
+        width = 0
+        max_ascent = 0
+        max_descent = 0
+        x = 0
+        positions = []
+        previous_char = None
 
-        if height is None:
-            height = _height
+        # Measure the text and record each glyph's horizontal position in a
+        # single pass, so kerning is only looked up once per character.
+        for char in text:
+            glyph = self.glyph_for_character(char)
+            kerning_x = self.kerning_offset(previous_char, char)
 
-        outbuffer = Bitmap(width, height)
+            max_ascent = max(max_ascent, glyph.ascent)
+            max_descent = max(max_descent, glyph.descent)
 
-        x = 0
-        previous_char = None
+            # With kerning, the advance width may be less than the width of the glyph's bitmap.
+            # Make sure we compute the total width so that all of the glyph's pixels
+            # fit into the returned dimensions.
+            width += max(glyph.advance_width, glyph.width) + kerning_x
 
-        for char, glyph in zip(text, glyphs):
             # Take kerning information into account before we render the
             # glyph to the output bitmap.
-            x += self.kerning_offset(previous_char, char)
-
-            # The vertical drawing position should place the glyph
-            # on the baseline as intended.
-            y = height - glyph.ascent - baseline
-
-            outbuffer.bitblt(glyph.bitmap, x, y)
+            x += kerning_x
+            positions.append((x, glyph))
             x += glyph.advance_width
 
             previous_char = char
 
+        if baseline is None:
+            baseline = max_descent
+        if height is None:
+            height = max_ascent + max_descent
+
+        outbuffer = Bitmap(width, height)
+
+        if not positions:
+            return outbuffer
+
+        # The glyph strips are pre-shifted to sit on the baseline (and cached
+        # per (height, baseline)), so the whole run can be rasterized with a
+        # single column scatter instead of one bitblt call per glyph.
+        cols = np.concatenate(
+            [np.arange(x, x + glyph.width) for x, glyph in positions])
+        vals = np.concatenate(
+            [glyph.prerendered_for(height, baseline).pixels
+             for x, glyph in positions], axis=1)
+
+        # Clip columns against the bitmap bounds, as bitblt would.
+        valid = (cols >= 0) & (cols < width)
+        if not valid.all():
+            cols = cols[valid]
+            vals = vals[:, valid]
+
+        if (np.diff(cols) > 0).all():
+            # Glyph bitmaps don't overlap: plain assignment is fastest.
+            outbuffer.pixels[:, cols] = vals
+        else:
+            # Negative kerning made neighbouring bitmaps overlap (e.g. "AVA"),
+            # so the overlapping columns must be OR-ed together.
+            np.bitwise_or.at(
+                outbuffer.pixels,
+                (np.arange(height)[:, None], cols[None, :]), vals)
+
         return outbuffer
 
 
 class Renderer:
     def __init__(self, font_path: str,
-                 font_size: int = 12, max_height: int = 12):
+                 font_size: int = 12, max_height: int = 12,
+                 cache_path: str = '.vitex-cache'):
         self.font = Font(font_path, font_size)
         self.max_height = max_height
 
+        # Baseline shared by all token renders. Prefer the font-wide descent,
+        # but give rows back to the ascenders when max_height can't hold both
+        # so that the preloaded ASCII set fits in full whenever it can.
+        max_ascent = max(g.ascent for g in self.font._glyphs.values())
+        self.baseline = max(0, min(self.font.descent, max_height - max_ascent))
+        if max_ascent + self.baseline > max_height:
+            warnings.warn(
+                f'max_height={max_height} is too small for {font_path} at '
+                f'size {font_size}: glyphs up to {max_ascent} pixels above '
+                f'the baseline will be clipped. Increase max_height or '
+                f'reduce the font size.')
+
+        # Persistent sentence cache so that reruns over the same corpus skip
+        # FreeType entirely. diskcache supports concurrent readers/writers,
+        # so worker processes can share one cache directory. Keying the hash
+        # with the font configuration and the font file's mtime invalidates
+        # entries when either changes.
+        self._cache = None
+        if cache_path is not None:
+            config = (f'{font_path}:{font_size}:{max_height}:'
+                      f'{self.baseline}:{os.path.getmtime(font_path)}')
+            self._cache_key = hashlib.blake2b(config.encode()).digest()
+            self._cache = diskcache.Cache(cache_path)
+
+    def _sentence_key(self, sentence: str):
+        return hashlib.blake2b(
+            sentence.encode(), key=self._cache_key).hexdigest()
+
+    @lru_cache(maxsize=200_000)
+    def _render_token(self, token: str):
+        """
+        Render a single whitespace-delimited token and return its 2D pixels.
+
+        Word frequencies are heavily Zipf-distributed, so caching rendered
+        tokens lets frequent words skip FreeType entirely. Tokens are rendered
+        against the shared baseline so cached bitmaps align when sentences
+        are stitched back together.
+        """
+        bitmap = self.font.render_text(
+            token, height=self.max_height, baseline=self.baseline)
+        return bitmap.pixels
+
     def __call__(self, sentence: str):
-        bitmap = self.font.render_text(sentence, height=self.max_height)
-        return (bitmap.width, bitmap.height, bitmap.pixels.astype(np.uint8))
+        if self._cache is not None:
+            key = self._sentence_key(sentence)
+            hit = self._cache.get(key)
+            if hit is not None:
+                width, n_bits, packed = hit
+                pixels = np.unpackbits(
+                    np.frombuffer(packed, dtype=np.uint8))[:n_bits]
+                return (width, self.max_height, pixels)
+
+        space = self._render_token(' ')
+        parts = []
+        for token in sentence.split(' '):
+            if parts:
+                parts.append(space)
+            parts.append(self._render_token(token))
+        pixels = np.concatenate(parts, axis=1)
+        height, width = pixels.shape
+        pixels = pixels.ravel()
+
+        if self._cache is not None:
+            self._cache[key] = (
+                width, pixels.size, np.packbits(pixels).tobytes())
+
+        return (width, height, pixels)
@@ -1,4 +1,6 @@
 from collections import OrderedDict
+
+import torch
 from torch import nn
 
 
@@ -20,8 +22,87 @@ class VitexCNN(nn.Module):
         self.blocks = nn.ModuleList([_create_block() for i in range(n_blocks)])
         self.proj = nn.Linear(patch_width * patch_height, emb_size)
 
-    def forward(self, x):
-        x = x.float().unsqueeze(1)
+        # Filled in by quantize_proj() for int8 weight-only inference.
+        self.register_buffer('proj_w_int8', None)
+        self.register_buffer('proj_scale', None)
+
+        # Input shapes are static (patch size is fixed at construction), so
+        # let TorchInductor fuse the conv+BN+ReLU+dropout blocks into fewer
+        # kernels. The actual compilation happens lazily on the first call.
+        if hasattr(torch, 'compile'):
+            self._fwd = torch.compile(
+                self._forward_impl, mode='reduce-overhead', dynamic=False)
+        else:
+            self._fwd = self._forward_impl
+
+    def fuse(self):
+        """
+        Fold each block's BatchNorm into its convolution for inference,
+        leaving a single conv kernel per block instead of a conv + BN pair.
+        Call after `.eval()`; returns the model for chaining.
+        """
+        assert not self.training, 'fuse() requires the model to be in eval mode'
+
+        for block in self.blocks:
+            block.conv = nn.utils.fuse_conv_bn_eval(block.conv, block.bn)
+            block.bn = nn.Identity()
+        return self
+
+    def quantize_proj(self):
+        """
+        Quantize the projection weights to int8 with per-output-row scales
+        and free the dense FP32 weights, cutting the weight footprint and
+        traffic of the dominant GEMM 4x. The quantization is destructive, so
+        this is for inference/export only; call after `.eval()`. Returns the
+        model for chaining.
+        """
+        assert not self.training, \
+            'quantize_proj() requires the model to be in eval mode'
+
+        w = self.proj.weight.detach()
+        scale = w.abs().amax(dim=1, keepdim=True).clamp(min=1e-8) / 127.0
+        # Stored pre-transposed as (in, out) for torch._int_mm.
+        self.proj_w_int8 = torch.round(w / scale).to(torch.int8).t().contiguous()
+        self.proj_scale = scale.t().contiguous()
+        self.proj.weight = None
+        return self
+
+    def _encode(self, x):
         for block in self.blocks:
             x = block(x)
-        return self.proj(x.view((x.shape[0], -1)))
+        x = x.reshape((x.shape[0], -1))
+
+        if self.proj_w_int8 is not None:
+            # Dynamically quantize the activations per row, run the GEMM
+            # entirely in int8 and rescale the int32 accumulators.
+            x_scale = x.abs().amax(dim=1, keepdim=True).clamp(min=1e-8) / 127.0
+            x_int8 = torch.round(x / x_scale).to(torch.int8)
+
+            k, n = self.proj_w_int8.shape
+            if x_int8.shape[0] > 16 and k % 8 == 0 and n % 8 == 0:
+                out = torch._int_mm(x_int8, self.proj_w_int8).float()
+            else:
+                # torch._int_mm requires batch > 16 and GEMM dims divisible
+                # by 8; run small batches and odd shapes as a plain matmul
+                # on the already-quantized operands.
+                out = x_int8.float() @ self.proj_w_int8.float()
+
+            out = out * x_scale.float() * self.proj_scale + self.proj.bias
+            return out.to(x.dtype)
+        return self.proj(x)
+
+    def _forward_impl(self, x):
+        if x.is_cuda:
+            # BF16 halves the bytes moved per element on the conv stack and
+            # the projection GEMM, and the channels_last layout lets cuDNN
+            # pick tensor-core kernels.
+            x = x.to(torch.bfloat16).unsqueeze(1).contiguous(
+                memory_format=torch.channels_last)
+            with torch.autocast(device_type='cuda', dtype=torch.bfloat16):
+                return self._encode(x)
+
+        # FP32 fallback on CPU.
+        return self._encode(x.float().unsqueeze(1))
+
+    def forward(self, x):
+        return self._fwd(x)
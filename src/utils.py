@@ -1,7 +1,10 @@
 
 import numpy as np
 
+# Character lookup table indexed by pixel state.
+_ASCII_LUT = np.array([' ', '#'], dtype='U1')
+
 
 def np2ascii(x):
-    for row in x:
-        print(''.join(['#' if c else ' ' for c in row.tolist()]))
+    chars = _ASCII_LUT[(np.asarray(x) != 0).astype(np.uint8)]
+    print('\n'.join(''.join(row) for row in chars))
@@ -1,17 +1,58 @@
 #!/usr/bin/env python
 
+import os
 import sys
+import array
 import argparse
 from pathlib import Path
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 from tqdm import tqdm
 
 import numpy as np
+import zstandard as zstd
 
 from src.backends import get_renderer
 
 FONT_PATH = "/usr/share/fonts/truetype"
 
+# Per-worker renderer set up by _init_worker().
+_renderer = None
+
+
+def _init_worker(backend, font, font_size, max_height):
+    global _renderer
+    # Each worker holds its own renderer; the diskcache-backed sentence
+    # cache supports concurrent writers, so all workers share it.
+    _renderer = get_renderer(backend)(font, font_size, max_height)
+
+
+def _render_chunk(lines):
+    return [_renderer(line.strip()) for line in lines]
+
+
+def _parallel_render(executor, lines, chunksize=1024):
+    """
+    Yield rendered lines in order, submitting chunks to `executor` with a
+    bounded in-flight window so the input file is consumed incrementally
+    instead of being read and pickled into pending futures all at once.
+    """
+    max_pending = 2 * (os.cpu_count() or 1)
+    lines = iter(lines)
+    pending = deque()
+
+    while True:
+        while len(pending) < max_pending:
+            chunk = list(islice(lines, chunksize))
+            if not chunk:
+                break
+            pending.append(executor.submit(_render_chunk, chunk))
+        if not pending:
+            break
+        yield from pending.popleft().result()
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -46,42 +87,59 @@ def main():
 
     print(f'Loading font: {str(font)}')
 
-    renderer = get_renderer(args.backend)(
-        str(font), args.font_size, args.max_height)
+    # Rendering is embarrassingly parallel across lines: fan the corpus out
+    # to one renderer per core, with map() keeping the line order intact.
+    executor = ProcessPoolExecutor(
+        initializer=_init_worker,
+        initargs=(args.backend, str(font), args.font_size, args.max_height))
 
     names = ['train', 'val', 'test']
 
     for name, prefix in zip(names, (args.train, args.val, args.test)):
-        fname = f'{name}-fs{args.font_size}-mh{args.max_height}.npz'
+        fname = f'{name}-fs{args.font_size}-mh{args.max_height}.zst'
+
+        # Per-line pixel counts as unboxed 64-bit ints; the slice table is
+        # derived from their cumulative sum after the loop.
+        lens = array.array('Q')
 
-        bitmaps = []
-        lens = []
-        slices = []
+        # Stream the rendered bitmaps directly into the output tensor, growing
+        # it geometrically, to avoid holding the corpus in a second Python list.
+        data = np.empty(1 << 20, dtype='bool')
+        s = 0
 
         print(f'Processing {name} split')
         src_file = prefix + f'.{src_lang}'
         with open(src_file) as f:
-            for idx, line in enumerate(tqdm(f)):
-                line = line.strip()
-                width, height, pixels = renderer(line)
+            results = _parallel_render(executor, f)
+            for idx, (width, height, pixels) in enumerate(tqdm(results)):
                 if height != args.max_height:
                     raise RuntimeError(f'height differed for line: {idx + 1}')
 
-                # process bitmap
-                bitmaps.append(pixels)
-                lens.append(height * width)
-
-        s = 0
-        data = np.empty(sum(lens), dtype='bool')
-
-        print(f'Filling the tensor of size: {data.size}')
-        for bmp, leng in zip(bitmaps, lens):
-            slices.append((s, s + leng))
-            data[s: s + leng] = bmp
-            s += leng
-
-        print(f'Saving into {fname}')
-        np.savez_compressed(fname, data=data, lens=slices)
+                leng = height * width
+                while s + leng > data.size:
+                    data = np.resize(data, data.size * 2)
+                data[s: s + leng] = pixels
+                lens.append(leng)
+                s += leng
+
+        data = data[:s]
+
+        lens = np.frombuffer(lens, dtype=np.int64)
+        ends = np.cumsum(lens)
+        slices = np.stack((ends - lens, ends), axis=1)
+
+        print(f'Saving into {fname} (tensor size: {data.size})')
+        # Pack 8 pixels per byte before compression: slices stay in pixel
+        # units, `n_bits` allows trimming the padding bits when unpacking.
+        # zstd compresses on all cores, unlike savez_compressed's
+        # single-threaded zlib pass.
+        compressor = zstd.ZstdCompressor(level=3, threads=-1)
+        with open(fname, 'wb') as f, compressor.stream_writer(f) as writer:
+            np.save(writer, np.packbits(data))
+            np.save(writer, np.asarray(data.size))
+            np.save(writer, np.asarray(slices))
+
+    executor.shutdown()
 
 
 if __name__ == '__main__':